@@ -5,105 +5,279 @@ This script saves generated incidents to both SQL Server and MongoDB
 
 import pyodbc
 import pymongo
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import json
 from incident_generator import Incident, IncidentBatchGenerator
 
+# Kept as one constant so pyodbc reuses the same prepared statement for every insert
+INSERT_INCIDENT_SQL = """
+    INSERT INTO incidents (
+        incident_id, caller_name, caller_age, caller_sex,
+        location_address, location_lat, location_lng,
+        emergency_type, priority, status, call_timestamp
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Rows per executemany call when saving incidents in bulk
+SQL_BATCH_SIZE = 1000
+
 class DataSaver:
-    def __init__(self):
+    def __init__(self, verbose=False):
+        # Per-incident progress output is opt-in; errors are always printed
+        self.verbose = verbose
         self.sql_connection = None
+        self.sql_cursor = None
         self.mongo_client = None
         self.mongo_db = None
-        self.connect_databases()
+        # SQL Server and MongoDB writes are independent, so run them side by side.
+        # pyodbc connections must not be shared between threads (threadsafety = 1),
+        # so all SQL work runs on this single dedicated worker while the MongoDB
+        # write (pymongo is thread-safe) runs on the calling thread
+        self.sql_executor = None
+        # Connections are opened on first use (see get_sql_cursor / get_mongo_db)
+        # so a DataSaver created before a fork does not hand sockets to children
     
     def connect_databases(self):
         """Connect to both databases"""
-        # Connect to SQL Server
-        self.sql_connection = pyodbc.connect(
+        self.get_sql_executor().submit(self.connect_sql).result()
+        self.connect_mongo()
+        print("✅ Connected to both databases")
+    
+    def connect_sql(self):
+        """Connect to SQL Server"""
+        connection = pyodbc.connect(
             "DRIVER={ODBC Driver 17 for SQL Server};"
             "SERVER=localhost\\SQLEXPRESS;"
             "DATABASE=EmergencyMock;"
             "Trusted_Connection=yes;"
         )
+        try:
+            # One cursor for all inserts; skip the "rows affected" message per statement
+            cursor = connection.cursor()
+            cursor.execute("SET NOCOUNT ON")
+            cursor.fast_executemany = True
+        except Exception:
+            # Don't leak the connection; the next save will reconnect from scratch
+            try:
+                connection.close()
+            except Exception:
+                pass
+            raise
         
-        # Connect to MongoDB
-        self.mongo_client = pymongo.MongoClient("mongodb://localhost:27017/")
+        # Only publish the handles once setup has fully succeeded
+        self.sql_connection = connection
+        self.sql_cursor = cursor
+    
+    def connect_mongo(self):
+        """Connect to MongoDB"""
+        # zlib ships with Python, so compression needs no extra dependency;
+        # fail fast if Mongo is down instead of waiting the 30s default
+        self.mongo_client = pymongo.MongoClient(
+            "mongodb://localhost:27017/",
+            compressors="zlib",
+            serverSelectionTimeoutMS=2000
+        )
         self.mongo_db = self.mongo_client["EmergencyMock"]
-        
-        print("✅ Connected to both databases")
+        self.ensure_indexes()
+    
+    def ensure_indexes(self):
+        """Best-effort index on incident_id, attempted once per MongoDB connection"""
+        # Detail lookups are always by incident_id (single or $in), so index it.
+        # The index is optional: a failure must never block a save, and it is not
+        # retried per write so a permanent failure (e.g. no createIndexes privilege)
+        # costs one round trip and one warning per connection, not per save
+        try:
+            self.mongo_db["incident_details"].create_index("incident_id")
+        except Exception as e:
+            print(f"⚠️ Could not create incident_id index: {e}")
+    
+    def reset_sql_connection(self):
+        """Close the SQL Server handles if possible and always forget them"""
+        # After a dropped connection close() itself tends to fail; either way
+        # the handles are unusable, so the next save must reconnect
+        cursor, connection = self.sql_cursor, self.sql_connection
+        self.sql_cursor = None
+        self.sql_connection = None
+        for handle in (cursor, connection):
+            if handle:
+                try:
+                    handle.close()
+                except Exception as e:
+                    print(f"❌ Error closing SQL Server handle: {e}")
+    
+    def reset_mongo_connection(self):
+        """Close the MongoDB client if possible and always forget it"""
+        client = self.mongo_client
+        self.mongo_client = None
+        self.mongo_db = None
+        if client:
+            try:
+                client.close()
+            except Exception as e:
+                print(f"❌ Error closing MongoDB client: {e}")
+    
+    def get_sql_executor(self):
+        """Return the single thread that owns the SQL Server connection, creating it if needed"""
+        if self.sql_executor is None:
+            self.sql_executor = ThreadPoolExecutor(max_workers=1)
+        return self.sql_executor
+    
+    def get_sql_cursor(self):
+        """Return the shared SQL Server cursor, connecting if needed"""
+        if self.sql_cursor is None:
+            self.connect_sql()
+        return self.sql_cursor
+    
+    def get_mongo_db(self):
+        """Return the MongoDB database, connecting if needed"""
+        if self.mongo_db is None:
+            self.connect_mongo()
+        return self.mongo_db
+    
+    def build_sql_params(self, incident):
+        """Build the INSERT_INCIDENT_SQL parameter tuple for an incident"""
+        return (
+            incident.incident_id,
+            incident.caller_info['name'],
+            incident.caller_info['age'],
+            incident.caller_info['sex'],
+            incident.location['address'],
+            incident.location['coordinates']['latitude'],
+            incident.location['coordinates']['longitude'],
+            incident.emergency_type,
+            incident.priority,
+            'dispatched',
+            incident.timestamp
+        )
+    
+    def build_mongo_document(self, incident, created_at):
+        """Build the detailed MongoDB document for an incident"""
+        return {
+            "incident_id": incident.incident_id,
+            "caller_info": incident.caller_info,
+            "location": incident.location,
+            "emergency_details": {
+                "type": incident.emergency_type,
+                "priority": incident.priority,
+                "symptoms": incident.symptoms,
+                "vital_signs": incident.vital_signs
+            },
+            "patient_condition": incident.patient_condition,
+            "operator_notes": incident.operator_notes,
+            "call_timestamp": incident.timestamp.isoformat(),
+            "created_at": created_at.isoformat()
+        }
     
     def save_incident_to_sql(self, incident):
         """Save incident to SQL Server"""
-        cursor = self.sql_connection.cursor()
-        
         try:
-            cursor.execute("""
-                INSERT INTO incidents (
-                    incident_id, caller_name, caller_age, caller_sex,
-                    location_address, location_lat, location_lng,
-                    emergency_type, priority, status, call_timestamp
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                incident.incident_id,
-                incident.caller_info['name'],
-                incident.caller_info['age'],
-                incident.caller_info['sex'],
-                incident.location['address'],
-                incident.location['coordinates']['latitude'],
-                incident.location['coordinates']['longitude'],
-                incident.emergency_type,
-                incident.priority,
-                'dispatched',
-                incident.timestamp
-            ))
+            self.get_sql_cursor().execute(INSERT_INCIDENT_SQL, self.build_sql_params(incident))
             
             self.sql_connection.commit()
-            print(f"✅ Saved incident {incident.incident_id} to SQL Server")
+            if self.verbose:
+                print(f"✅ Saved incident {incident.incident_id} to SQL Server")
             
         except Exception as e:
             print(f"❌ Error saving to SQL Server: {e}")
+            # The connection may be dead; start fresh on the next save
+            self.reset_sql_connection()
     
-    def save_incident_to_mongo(self, incident):
+    def save_incidents_to_sql(self, incidents):
+        """Save a batch of incidents to SQL Server with one commit"""
+        if not incidents:
+            return
+        
+        try:
+            cursor = self.get_sql_cursor()
+            rows = [self.build_sql_params(incident) for incident in incidents]
+            
+            # Send parameters in array batches instead of one round trip per row
+            for start in range(0, len(rows), SQL_BATCH_SIZE):
+                cursor.executemany(INSERT_INCIDENT_SQL, rows[start:start + SQL_BATCH_SIZE])
+            
+            self.sql_connection.commit()
+            if self.verbose:
+                print(f"✅ Saved {len(rows)} incidents to SQL Server")
+            
+        except Exception as e:
+            print(f"❌ Error saving batch to SQL Server: {e}")
+            # A dropped connection makes rollback fail too; don't let that escape
+            if self.sql_connection:
+                try:
+                    self.sql_connection.rollback()
+                except Exception as rollback_error:
+                    print(f"❌ Error rolling back SQL Server batch: {rollback_error}")
+            # The connection may be dead; start fresh on the next save
+            self.reset_sql_connection()
+    
+    def save_incident_to_mongo(self, incident, created_at=None):
         """Save detailed incident to MongoDB"""
+        if created_at is None:
+            created_at = datetime.now()
+        
         try:
-            # Prepare the document
-            incident_doc = {
-                "incident_id": incident.incident_id,
-                "caller_info": incident.caller_info,
-                "location": incident.location,
-                "emergency_details": {
-                    "type": incident.emergency_type,
-                    "priority": incident.priority,
-                    "symptoms": incident.symptoms,
-                    "vital_signs": incident.vital_signs
-                },
-                "patient_condition": incident.patient_condition,
-                "operator_notes": incident.operator_notes,
-                "call_timestamp": incident.timestamp.isoformat(),
-                "created_at": datetime.now().isoformat()
-            }
+            incident_doc = self.build_mongo_document(incident, created_at)
             
             # Insert into MongoDB
-            collection = self.mongo_db["incident_details"]
+            collection = self.get_mongo_db()["incident_details"]
             collection.insert_one(incident_doc)
             
-            print(f"✅ Saved incident {incident.incident_id} to MongoDB")
+            if self.verbose:
+                print(f"✅ Saved incident {incident.incident_id} to MongoDB")
             
         except Exception as e:
             print(f"❌ Error saving to MongoDB: {e}")
     
-    def save_incident(self, incident):
+    def save_incidents_to_mongo(self, incidents, created_at=None):
+        """Save a batch of detailed incidents to MongoDB with one insert_many"""
+        if not incidents:
+            return
+        if created_at is None:
+            created_at = datetime.now()
+        
+        try:
+            incident_docs = [self.build_mongo_document(incident, created_at) for incident in incidents]
+            
+            collection = self.get_mongo_db()["incident_details"]
+            collection.insert_many(incident_docs, ordered=False)
+            
+            if self.verbose:
+                print(f"✅ Saved {len(incident_docs)} incidents to MongoDB")
+            
+        except Exception as e:
+            print(f"❌ Error saving batch to MongoDB: {e}")
+    
+    def save_incident(self, incident, created_at=None):
         """Save incident to both databases"""
-        print(f"\n=== SAVING INCIDENT {incident.incident_id} ===")
-        self.save_incident_to_sql(incident)
-        self.save_incident_to_mongo(incident)
+        if self.verbose:
+            print(f"\n=== SAVING INCIDENT {incident.incident_id} ===")
+        sql_future = self.get_sql_executor().submit(self.save_incident_to_sql, incident)
+        self.save_incident_to_mongo(incident, created_at)
+        sql_future.result()
+    
+    def save_incidents(self, incidents):
+        """Save a batch of incidents to both databases"""
+        incidents = list(incidents)
+        if self.verbose:
+            print(f"\n=== SAVING {len(incidents)} INCIDENTS ===")
+        created_at = datetime.now()
+        sql_future = self.get_sql_executor().submit(self.save_incidents_to_sql, incidents)
+        self.save_incidents_to_mongo(incidents, created_at)
+        sql_future.result()
     
     def close_connections(self):
         """Close database connections"""
-        if self.sql_connection:
-            self.sql_connection.close()
-        if self.mongo_client:
-            self.mongo_client.close()
+        # Each handle is closed on its own and always reset, so one failing
+        # close neither leaks the others nor leaves stale handles behind.
+        # The SQL handles are closed on the thread that owns them.
+        if self.sql_executor:
+            self.sql_executor.submit(self.reset_sql_connection).result()
+            self.sql_executor.shutdown(wait=True)
+            self.sql_executor = None
+        else:
+            self.reset_sql_connection()
+        self.reset_mongo_connection()
         print("Database connections closed")
 
 def test_data_saving():
@@ -111,7 +285,7 @@ def test_data_saving():
     print("=== TESTING DATA SAVING ===")
     
     # Create data saver
-    saver = DataSaver()
+    saver = DataSaver(verbose=True)
     
     # Generate and save a single incident
     incident = Incident()
@@ -121,8 +295,7 @@ def test_data_saving():
     generator = IncidentBatchGenerator()
     incidents = generator.generate_batch(3)
     
-    for incident in incidents:
-        saver.save_incident(incident)
+    saver.save_incidents(incidents)
     
     saver.close_connections()
     print("\n🎉 Data saving test complete!")
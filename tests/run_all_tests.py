@@ -44,6 +44,16 @@ def run_database_tests():
         print(f"❌ Database tests failed: {e}")
         return False
 
+def run_data_saver_tests():
+    """Run data saver tests"""
+    print("\n🔍 === RUNNING DATA SAVER TESTS ===")
+    try:
+        from test_data_saver import run_all_data_saver_tests
+        return run_all_data_saver_tests()
+    except Exception as e:
+        print(f"❌ Data saver tests failed: {e}")
+        return False
+
 def run_system_integration_test():
     """Run the comprehensive system test"""
     print("\n🔍 === RUNNING SYSTEM INTEGRATION TEST ===")
@@ -110,6 +120,7 @@ def main():
         "Faker Library Test": run_faker_test,
         "Data Generator Tests": run_data_generator_tests,
         "Database Connection Tests": run_database_tests,
+        "Data Saver Tests": run_data_saver_tests,
         "System Integration Test": run_system_integration_test
     }
     
@@ -0,0 +1,360 @@
+"""
+Test Data Saver
+
+This script checks the batch saving behaviour of DataSaver with pyodbc and pymongo
+stubbed out, so it runs without SQL Server or MongoDB.
+"""
+
+import sys
+import os
+import types
+import importlib
+import threading
+from datetime import datetime
+from unittest import mock
+
+# Add the backend directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+# data_saver imports its drivers and the incident generator at module level,
+# so load it against stand-in modules
+with mock.patch.dict(sys.modules, {
+    'pyodbc': mock.MagicMock(),
+    'pymongo': mock.MagicMock(),
+    'incident_generator': mock.MagicMock(),
+}):
+    data_saver = importlib.import_module('data_saver')
+
+def make_incident(number):
+    """Build a minimal incident with the attributes DataSaver reads"""
+    return types.SimpleNamespace(
+        incident_id=f"INC{number:05d}",
+        caller_info={'name': 'Test Caller', 'age': 40, 'sex': 'F'},
+        location={
+            'address': '900 E Broad St, Richmond, VA',
+            'coordinates': {'latitude': 37.5407, 'longitude': -77.4360}
+        },
+        emergency_type='Fall',
+        priority=3,
+        symptoms=['Hip pain'],
+        vital_signs={'heart_rate': 88},
+        patient_condition='Stable',
+        operator_notes='Test note',
+        timestamp=datetime(2024, 1, 1, 12, 0, 0)
+    )
+
+def make_saver():
+    """Create a DataSaver wired to fresh driver stubs"""
+    pyodbc_stub = mock.MagicMock()
+    pymongo_stub = mock.MagicMock()
+    patches = [
+        mock.patch.object(data_saver, 'pyodbc', pyodbc_stub),
+        mock.patch.object(data_saver, 'pymongo', pymongo_stub),
+    ]
+    for patch in patches:
+        patch.start()
+
+    connection = pyodbc_stub.connect.return_value
+    cursor = connection.cursor.return_value
+    collection = pymongo_stub.MongoClient.return_value["EmergencyMock"]["incident_details"]
+    return data_saver.DataSaver(), pyodbc_stub, connection, cursor, collection, patches
+
+def stop_patches(patches):
+    for patch in patches:
+        patch.stop()
+
+def test_batch_chunking():
+    """Test that a large batch is chunked, committed once, and shares created_at"""
+    print("🔍 === TESTING BATCH CHUNKING ===")
+
+    saver, pyodbc_stub, connection, cursor, collection, patches = make_saver()
+    try:
+        # Pass a generator to make sure save_incidents materializes its input
+        saver.save_incidents(make_incident(i) for i in range(2500))
+
+        chunk_sizes = [len(call.args[1]) for call in cursor.executemany.call_args_list]
+        assert chunk_sizes == [1000, 1000, 500], f"unexpected chunks {chunk_sizes}"
+        assert all(call.args[0] == data_saver.INSERT_INCIDENT_SQL for call in cursor.executemany.call_args_list)
+        print(f"✅ executemany chunks: {chunk_sizes}")
+
+        assert connection.commit.call_count == 1, f"commit called {connection.commit.call_count} times"
+        assert connection.rollback.call_count == 0
+        print("✅ One commit, no rollback")
+
+        assert collection.insert_many.call_count == 1
+        docs = collection.insert_many.call_args.args[0]
+        assert collection.insert_many.call_args.kwargs == {'ordered': False}
+        assert len(docs) == 2500
+        assert len({doc['created_at'] for doc in docs}) == 1, "created_at differs within a batch"
+        print("✅ One insert_many(ordered=False) with a shared created_at")
+
+        print("✅ Batch chunking test passed")
+        return True
+
+    except AssertionError as e:
+        print(f"❌ Batch chunking test failed: {e}")
+        return False
+    finally:
+        saver.close_connections()
+        stop_patches(patches)
+
+def test_batch_rollback_on_failure():
+    """Test that a failed batch rolls back and still saves to MongoDB"""
+    print("\n🔍 === TESTING BATCH ROLLBACK ===")
+
+    saver, pyodbc_stub, connection, cursor, collection, patches = make_saver()
+    try:
+        cursor.executemany.side_effect = Exception("connection lost")
+        saver.save_incidents([make_incident(i) for i in range(3)])
+
+        assert connection.rollback.call_count == 1, "rollback was not called"
+        assert connection.commit.call_count == 0, "commit ran after a failed batch"
+        assert collection.insert_many.call_count == 1, "MongoDB write skipped"
+        print("✅ Failed batch rolled back, MongoDB batch still saved")
+
+        # A dropped connection makes rollback fail too; the error must not escape
+        connection.rollback.side_effect = Exception("connection lost")
+        saver.save_incidents([make_incident(i) for i in range(3)])
+        assert collection.insert_many.call_count == 2, "MongoDB write skipped"
+        print("✅ Failed rollback handled without raising")
+
+        print("✅ Batch rollback test passed")
+        return True
+
+    except Exception as e:
+        print(f"❌ Batch rollback test failed: {e}")
+        return False
+    finally:
+        saver.close_connections()
+        stop_patches(patches)
+
+def test_reconnect_after_close():
+    """Test that a closed or half-built SQL connection is never reused"""
+    print("\n🔍 === TESTING RECONNECT AFTER CLOSE ===")
+
+    saver, pyodbc_stub, connection, cursor, collection, patches = make_saver()
+    try:
+        # Cursor setup fails once: that connection must be closed, not kept around
+        def fail_first_call(*args):
+            if cursor.execute.call_count == 1:
+                raise Exception("login timeout")
+        cursor.execute.side_effect = fail_first_call
+        saver.save_incident(make_incident(1))
+        assert connection.close.call_count == 1, "half-built connection was not closed"
+        assert saver.sql_connection is None and saver.sql_cursor is None
+        print("✅ Failed cursor setup closed its connection")
+
+        saver.save_incident(make_incident(2))
+        assert pyodbc_stub.connect.call_count == 2
+        assert cursor.execute.call_count == 3, "insert did not run after reconnect"
+        assert cursor.execute.call_args.args[0] == data_saver.INSERT_INCIDENT_SQL
+        assert connection.commit.call_count == 1, "insert after reconnect was not committed"
+        print("✅ Next save reconnected")
+
+        # After close, saving again must reconnect and schedule work normally
+        saver.close_connections()
+        assert saver.sql_cursor is None and saver.mongo_db is None and saver.sql_executor is None
+        saver.save_incident(make_incident(3))
+        assert pyodbc_stub.connect.call_count == 3
+        assert connection.commit.call_count == 2, "insert after close was not committed"
+        assert collection.insert_one.call_count == 3
+        print("✅ Save after close_connections reconnected")
+
+        print("✅ Reconnect test passed")
+        return True
+
+    except Exception as e:
+        print(f"❌ Reconnect test failed: {e}")
+        return False
+    finally:
+        saver.close_connections()
+        stop_patches(patches)
+
+def test_dead_connection_is_discarded():
+    """Test that SQL errors and failing closes never leave stale handles behind"""
+    print("\n🔍 === TESTING DEAD CONNECTION HANDLING ===")
+
+    saver, pyodbc_stub, connection, cursor, collection, patches = make_saver()
+    try:
+        saver.save_incident(make_incident(1))
+        assert pyodbc_stub.connect.call_count == 1
+
+        # Link drops mid-insert: the handles are thrown away and the next save reconnects
+        cursor.execute.side_effect = Exception("Communication link failure")
+        saver.save_incident(make_incident(2))
+        assert saver.sql_cursor is None and saver.sql_connection is None, "dead handles kept"
+        cursor.execute.side_effect = None
+        saver.save_incident(make_incident(3))
+        assert pyodbc_stub.connect.call_count == 2, "did not reconnect after a failed insert"
+        print("✅ Failed insert discarded the connection and the next save reconnected")
+
+        # Same for a failed batch
+        cursor.executemany.side_effect = Exception("Communication link failure")
+        saver.save_incidents([make_incident(4)])
+        assert saver.sql_cursor is None and saver.sql_connection is None, "dead handles kept"
+        print("✅ Failed batch discarded the connection")
+
+        # close_connections keeps going when a close fails
+        cursor.executemany.side_effect = None
+        saver.save_incidents([make_incident(5)])
+        connection.close.reset_mock()
+        cursor.close.side_effect = Exception("Communication link failure")
+        saver.close_connections()
+        assert connection.close.call_count == 1, "SQL connection not closed after cursor close failed"
+        assert saver.mongo_client is None and saver.mongo_db is None, "MongoDB client not reset"
+        assert saver.sql_cursor is None and saver.sql_connection is None, "SQL handles not reset"
+        print("✅ Failing cursor close still closed and reset everything")
+
+        print("✅ Dead connection test passed")
+        return True
+
+    except Exception as e:
+        print(f"❌ Dead connection test failed: {e}")
+        return False
+    finally:
+        cursor.close.side_effect = None
+        saver.close_connections()
+        stop_patches(patches)
+
+def test_index_failure_does_not_block_saves():
+    """Test that a failing create_index is attempted once and never costs a document"""
+    print("\n🔍 === TESTING INDEX FAILURE ===")
+
+    saver, pyodbc_stub, connection, cursor, collection, patches = make_saver()
+    try:
+        collection.create_index.side_effect = Exception("not authorized to createIndexes")
+        for i in range(3):
+            saver.save_incident(make_incident(i))
+        saver.save_incidents([make_incident(i) for i in range(3, 6)])
+
+        assert collection.create_index.call_count == 1, \
+            f"create_index called {collection.create_index.call_count} times"
+        print("✅ Index attempted once per connection, not per save")
+
+        assert collection.insert_one.call_count == 3, "single-incident writes were lost"
+        assert collection.insert_many.call_count == 1, "batch write was lost"
+        print("✅ Every MongoDB write still ran")
+
+        # A fresh connection gets one new attempt
+        saver.close_connections()
+        saver.save_incident(make_incident(6))
+        assert collection.create_index.call_count == 2
+        print("✅ Reconnect attempts the index again")
+
+        print("✅ Index failure test passed")
+        return True
+
+    except AssertionError as e:
+        print(f"❌ Index failure test failed: {e}")
+        return False
+    finally:
+        saver.close_connections()
+        stop_patches(patches)
+
+def test_sql_pinned_to_one_thread():
+    """Test that SQL work stays on one thread and overlaps with the MongoDB write"""
+    print("\n🔍 === TESTING SQL THREAD PINNING ===")
+
+    saver, pyodbc_stub, connection, cursor, collection, patches = make_saver()
+    try:
+        sql_threads = set()
+        mongo_threads = set()
+        mongo_started = threading.Event()
+        overlapped = []
+
+        def record_sql(*args, **kwargs):
+            sql_threads.add(threading.get_ident())
+
+        def record_mongo(*args, **kwargs):
+            mongo_threads.add(threading.get_ident())
+            mongo_started.set()
+
+        def wait_for_mongo(*args, **kwargs):
+            # Only returns True if the MongoDB write runs while SQL is in flight
+            record_sql()
+            overlapped.append(mongo_started.wait(timeout=2))
+
+        pyodbc_stub.connect.side_effect = lambda *args: (record_sql(), connection)[1]
+        cursor.execute.side_effect = record_sql
+        connection.commit.side_effect = record_sql
+        cursor.close.side_effect = record_sql
+        connection.close.side_effect = record_sql
+        cursor.executemany.side_effect = wait_for_mongo
+        collection.insert_one.side_effect = record_mongo
+        collection.insert_many.side_effect = record_mongo
+
+        saver.connect_databases()
+        saver.save_incident(make_incident(1))
+        saver.save_incident(make_incident(2))
+        saver.save_incidents([make_incident(i) for i in range(3, 6)])
+        saver.close_connections()
+
+        assert len(sql_threads) == 1, f"SQL work ran on {len(sql_threads)} threads"
+        assert threading.get_ident() not in sql_threads, "SQL work ran on the calling thread"
+        print("✅ Connect, inserts, commits and close all ran on one SQL thread")
+
+        assert mongo_threads == {threading.get_ident()}, "MongoDB writes left the calling thread"
+        assert overlapped == [True], "SQL and MongoDB writes did not overlap"
+        print("✅ MongoDB write overlapped the in-flight SQL batch")
+
+        print("✅ SQL thread pinning test passed")
+        return True
+
+    except AssertionError as e:
+        print(f"❌ SQL thread pinning test failed: {e}")
+        return False
+    finally:
+        saver.close_connections()
+        stop_patches(patches)
+
+def test_empty_batch():
+    """Test that an empty batch does not touch either database"""
+    print("\n🔍 === TESTING EMPTY BATCH ===")
+
+    saver, pyodbc_stub, connection, cursor, collection, patches = make_saver()
+    try:
+        saver.save_incidents(iter([]))
+
+        assert pyodbc_stub.connect.call_count == 0, "SQL Server connected for an empty batch"
+        assert collection.insert_many.call_count == 0, "insert_many called for an empty batch"
+        print("✅ Empty batch skipped both databases")
+
+        print("✅ Empty batch test passed")
+        return True
+
+    except AssertionError as e:
+        print(f"❌ Empty batch test failed: {e}")
+        return False
+    finally:
+        saver.close_connections()
+        stop_patches(patches)
+
+def run_all_data_saver_tests():
+    """Run all data saver tests"""
+    print("🚀 === STARTING DATA SAVER TESTS ===\n")
+
+    tests = [
+        test_batch_chunking,
+        test_batch_rollback_on_failure,
+        test_reconnect_after_close,
+        test_dead_connection_is_discarded,
+        test_index_failure_does_not_block_saves,
+        test_sql_pinned_to_one_thread,
+        test_empty_batch
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        if test():
+            passed += 1
+
+    print(f"\n📊 === DATA SAVER TEST RESULTS ===")
+    print(f"Passed: {passed}/{total}")
+    print(f"Success Rate: {(passed/total)*100:.1f}%")
+
+    return passed == total
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_data_saver_tests() else 1)